@@ -0,0 +1,340 @@
+import numpy as np
+
+from backend.results import JobResults
+from backend.matching import normalize_name, brand_matches
+
+# -----------------------------
+# TUNING
+# -----------------------------
+
+CLUSTER_THRESHOLD = 0.8      # cosine similarity of char trigram sets
+TRIGRAM_SPACE = 1 << 24      # byte trigram codes fit in 24 bits
+PAIR_BLOCK = 1 << 20         # posting entries expanded per block (bounds memory)
+
+# -----------------------------
+# N-GRAM CLUSTERING
+# -----------------------------
+
+def name_trigrams(names: list[str]):
+    # distinct byte trigrams per name as parallel (name index, code) arrays;
+    # codes are exact (a << 16 | b << 8 | c), so no hashing collisions
+    padded = [b" " + n.encode() + b" " for n in names]
+    lengths = np.array([len(p) for p in padded], dtype=np.intp)
+
+    chars = np.frombuffer(b"".join(padded), dtype=np.uint8).astype(np.int64)
+    starts = np.cumsum(lengths) - lengths
+
+    owner = np.repeat(np.arange(len(names)), lengths)
+    position = np.arange(len(chars)) - starts[owner]
+    valid = position <= lengths[owner] - 3
+
+    at = np.flatnonzero(valid)
+    codes = (chars[at] << 16) | (chars[at + 1] << 8) | chars[at + 2]
+
+    keys = np.unique(owner[at] * TRIGRAM_SPACE + codes)
+    return keys // TRIGRAM_SPACE, keys % TRIGRAM_SPACE
+
+
+def _prefix_entries(owner: np.ndarray, codes: np.ndarray, sizes: np.ndarray, threshold: float):
+    # prefix filter: with trigrams ordered rarest first, two names with
+    # cosine >= t share at least a = ceil(t^2 * |A|) trigrams, so their
+    # prefixes of length |A| - a + 2 share at least two of them (one when
+    # both names are a single trigram). common trigrams never get indexed.
+    unique_codes, code_inverse, code_freq = np.unique(
+        codes, return_inverse=True, return_counts=True
+    )
+    rank = np.empty(len(unique_codes), dtype=np.intp)
+    rank[np.lexsort((unique_codes, code_freq))] = np.arange(len(unique_codes))
+    token = rank[code_inverse]
+
+    order = np.lexsort((token, owner))
+    owner, token = owner[order], token[order]
+
+    name_start = np.cumsum(sizes) - sizes
+    pos_in_name = np.arange(len(owner)) - name_start[owner]
+    prefix = sizes - np.ceil(threshold ** 2 * sizes).astype(np.intp) + 2
+    keep = pos_in_name < prefix[owner]
+
+    return owner[keep], token[keep]
+
+
+def _overlap(keys, name_start, codes, i, j, sizes) -> np.ndarray:
+    # |trigrams(i) & trigrams(j)| by probing j's sorted keys with i's codes
+    per_pair = sizes[i]
+    pair_of = np.repeat(np.arange(len(i)), per_pair)
+    probe_at = np.repeat(name_start[i], per_pair) + (
+        np.arange(len(pair_of)) - np.repeat(np.cumsum(per_pair) - per_pair, per_pair)
+    )
+    probe = j[pair_of] * TRIGRAM_SPACE + codes[probe_at]
+
+    hit = np.searchsorted(keys, probe)
+    hit = keys[np.minimum(hit, len(keys) - 1)] == probe
+    return np.bincount(pair_of, weights=hit, minlength=len(i))
+
+
+def similar_pairs(names: list[str], threshold: float = CLUSTER_THRESHOLD):
+    # cosine over binary trigram sets, checked only for candidate pairs
+    # found through a sparse inverted index of prefix trigrams. names are
+    # processed in blocks so the expanded posting lists stay bounded.
+    n = len(names)
+    owner, codes = name_trigrams(names)
+    sizes = np.bincount(owner, minlength=n)
+    name_start = np.cumsum(sizes) - sizes
+    keys = owner * TRIGRAM_SPACE + codes
+
+    entry_owner, entry_token = _prefix_entries(owner, codes, sizes, threshold)
+
+    post_order = np.argsort(entry_token, kind="stable")
+    post_token = entry_token[post_order]
+    post_owner = entry_owner[post_order]
+
+    post_lo = np.searchsorted(post_token, entry_token, side="left")
+    post_len = np.searchsorted(post_token, entry_token, side="right") - post_lo
+
+    name_cost = np.bincount(entry_owner, weights=post_len, minlength=n)
+    name_block = (np.cumsum(name_cost) // PAIR_BLOCK).astype(np.intp)
+    block_edges = np.searchsorted(
+        entry_owner, np.flatnonzero(np.diff(name_block, prepend=-1) != 0)
+    )
+
+    found_i, found_j = [], []
+    for lo, hi in zip(block_edges, np.r_[block_edges[1:], len(entry_owner)]):
+        lengths = post_len[lo:hi]
+        left = np.repeat(entry_owner[lo:hi], lengths)
+        offset = np.arange(len(left)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        right = post_owner[np.repeat(post_lo[lo:hi], lengths) + offset]
+
+        # each unordered pair once, from its lower index
+        upper = right > left
+        pairs, shared = np.unique(left[upper] * n + right[upper], return_counts=True)
+        i, j = pairs // n, pairs % n
+
+        needed = np.where(sizes[i] * sizes[j] * threshold ** 2 <= 1, 1, 2)
+        small, large = np.minimum(sizes[i], sizes[j]), np.maximum(sizes[i], sizes[j])
+        keep = (shared >= needed) & (small >= threshold ** 2 * large)
+        i, j = i[keep], j[keep]
+
+        overlap = _overlap(keys, name_start, codes, i, j, sizes)
+        similar = overlap >= threshold * np.sqrt(sizes[i] * sizes[j])
+
+        found_i.append(i[similar])
+        found_j.append(j[similar])
+
+    if not found_i:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    return np.concatenate(found_i), np.concatenate(found_j)
+
+
+def cluster_names(names: list[str], threshold: float = CLUSTER_THRESHOLD) -> np.ndarray:
+    # names must be ordered by priority (heaviest first). each name joins
+    # the highest-priority name it is similar to; a single hop, so
+    # "brand1" ~ "brand12" ~ "brand123" cannot chain into one cluster
+    labels = np.arange(len(names))
+    if len(names) < 2:
+        return labels
+
+    i, j = similar_pairs(names, threshold)
+
+    np.minimum.at(labels, i, j)
+    np.minimum.at(labels, j, i)
+    return labels
+
+
+def canonicalize(
+    names: list[str],
+    weights: list[float] | None = None,
+    threshold: float = CLUSTER_THRESHOLD
+):
+    # works on any bag of names: one job's answers or stored history.
+    # returns (cluster id per input name or -1, canonical key per input name)
+    keys = [normalize_name(n) for n in names]
+    if weights is None:
+        weights = [1.0] * len(keys)
+
+    key_weight = {}
+    for key, w in zip(keys, weights):
+        if key:
+            key_weight[key] = key_weight.get(key, 0.0) + w
+
+    unique_keys = sorted(key_weight, key=lambda k: (-key_weight[k], k))
+    key_index = {k: i for i, k in enumerate(unique_keys)}
+    key_labels = cluster_names(unique_keys, threshold)
+
+    labels = np.array(
+        [key_labels[key_index[k]] if k else -1 for k in keys],
+        dtype=np.intp
+    )
+    return labels, keys
+
+# -----------------------------
+# MENTION TABLE
+# -----------------------------
+
+def _as_numpy(values) -> np.ndarray:
+    return np.frombuffer(values, dtype=f"u{values.itemsize}").astype(np.intp)
+
+
+def rank_weight(rank: np.ndarray) -> np.ndarray:
+    # position 0 -> 1.0, 1 -> 0.63, 2 -> 0.5, ...
+    return 1.0 / np.log2(rank + 2.0)
+
+
+def _mentions(results: JobResults, provider_weights: dict):
+    n_providers = len(results.providers)
+
+    brand_ids = _as_numpy(results.brand_ids)
+    offsets = _as_numpy(results.brand_offsets)
+    lengths = np.diff(offsets)
+
+    slot = np.repeat(np.arange(len(lengths)), lengths)
+    prompt = slot // n_providers
+    provider = slot % n_providers
+    rank = np.arange(len(brand_ids)) - offsets[slot]
+
+    provider_weight = np.array(
+        [provider_weights.get(p, 1.0) for p in results.providers], dtype=np.float64
+    )
+    weight = rank_weight(rank) * provider_weight[provider]
+
+    keyword = _as_numpy(results.keyword_idx)[prompt]
+
+    return brand_ids, prompt, keyword, weight
+
+# -----------------------------
+# AGGREGATION
+# -----------------------------
+
+def _top_rows(scores: np.ndarray, top_n: int, exclude: int) -> np.ndarray:
+    scores = scores.copy()
+    if exclude >= 0:
+        scores[..., exclude] = 0.0
+    order = np.argsort(-scores, axis=-1, kind="stable")[..., :top_n]
+    return order
+
+
+def aggregate_competitors(
+    results: JobResults,
+    brand: str,
+    top_n: int = 3,
+    provider_weights: dict | None = None
+) -> dict:
+    brand_ids, prompt, keyword, weight = _mentions(results, provider_weights or {})
+
+    n_prompts = len(results)
+    n_keywords = len(results.keywords)
+
+    # ---- canonicalize every distinct answer line once (+ the target brand) ----
+    unique_ids, mention_inverse = np.unique(brand_ids, return_inverse=True)
+    id_weight = np.bincount(mention_inverse, weights=weight, minlength=len(unique_ids))
+
+    names = results.brands.names(unique_ids.tolist())
+    keys = [normalize_name(n) for n in names]
+
+    # the brand's own mentions use the same matcher as visibility, so the
+    # own share of voice is non-zero exactly when the brand was found;
+    # only the remaining names are clustered into competitors
+    is_own = np.fromiter(
+        (brand_matches(brand, n) for n in names), dtype=bool, count=len(names)
+    )
+    others = np.flatnonzero(~is_own)
+    other_labels, _ = canonicalize([names[i] for i in others], id_weight[others].tolist())
+
+    brand_label = len(names)
+    labels = np.full(len(names), brand_label, dtype=np.intp)
+    labels[others] = other_labels
+
+    mention_label = labels[mention_inverse]
+    keep = mention_label >= 0
+
+    cluster_ids, mention_cluster = np.unique(mention_label[keep], return_inverse=True)
+    n_clusters = len(cluster_ids)
+
+    own = np.flatnonzero(cluster_ids == brand_label)
+    own = int(own[0]) if len(own) else -1
+
+    prompt, keyword, weight = prompt[keep], keyword[keep], weight[keep]
+
+    # ---- display name: heaviest normalized spelling in each cluster ----
+    mention_key = mention_inverse[keep]
+    key_weight = np.bincount(mention_key, weights=weight, minlength=len(unique_ids))
+    key_cluster = np.full(len(unique_ids), -1, dtype=np.intp)
+    key_cluster[mention_key] = mention_cluster
+
+    present = np.flatnonzero(key_cluster >= 0)
+    order = np.lexsort((-key_weight[present], key_cluster[present]))
+    present = present[order]
+    first = np.diff(key_cluster[present], prepend=-1) != 0
+    display = [keys[i] for i in present[first]]
+
+    # ---- keyword x cluster scores ----
+    by_keyword = np.bincount(
+        keyword * n_clusters + mention_cluster,
+        weights=weight,
+        minlength=n_keywords * n_clusters
+    ).astype(np.float64).reshape(n_keywords, n_clusters)
+
+    overall = by_keyword.sum(axis=0)
+
+    keyword_totals = by_keyword.sum(axis=1, keepdims=True)
+    share = np.divide(
+        by_keyword * 100.0,
+        keyword_totals,
+        out=np.zeros_like(by_keyword),
+        where=keyword_totals > 0
+    )
+    overall_share = overall * 100.0 / overall.sum() if overall.sum() else overall
+
+    def ranked(scores, shares, idx):
+        return [
+            {
+                "brand": display[c],
+                "score": round(float(scores[c]), 3),
+                "share_of_voice": round(float(shares[c]), 2)
+            }
+            for c in idx
+            if c != own and scores[c] > 0
+        ]
+
+    top_overall = _top_rows(overall, top_n, own)
+    top_keyword = _top_rows(by_keyword, top_n, own)
+
+    # ---- per prompt top-N (sparse: only observed prompt/cluster pairs) ----
+    pair_keys, pair_inverse = np.unique(
+        prompt * n_clusters + mention_cluster, return_inverse=True
+    )
+    pair_score = np.bincount(pair_inverse, weights=weight)
+    pair_prompt = pair_keys // max(n_clusters, 1)
+    pair_cluster = pair_keys % max(n_clusters, 1)
+
+    if own >= 0:
+        mask = pair_cluster != own
+        pair_score, pair_prompt, pair_cluster = (
+            pair_score[mask], pair_prompt[mask], pair_cluster[mask]
+        )
+
+    order = np.lexsort((-pair_score, pair_prompt))
+    pair_prompt, pair_cluster = pair_prompt[order], pair_cluster[order]
+
+    group_start = np.r_[0, np.flatnonzero(np.diff(pair_prompt)) + 1]
+    group_size = np.diff(np.r_[group_start, len(pair_prompt)])
+    position = np.arange(len(pair_prompt)) - np.repeat(group_start, group_size)
+    top = position < top_n
+
+    display_ids = np.array([results.brands.intern(name) for name in display], dtype=np.intp)
+    prompt_top_ids = display_ids[pair_cluster[top]]
+    prompt_top_offsets = np.r_[
+        0, np.cumsum(np.bincount(pair_prompt[top], minlength=n_prompts))
+    ]
+
+    results.set_top_brands(prompt_top_ids.tolist(), prompt_top_offsets.tolist())
+
+    return {
+        "top_brands": ranked(overall, overall_share, top_overall),
+        "by_keyword": {
+            kw: {
+                "brand_share_of_voice": round(float(share[k, own]), 2) if own >= 0 else 0.0,
+                "competitors": ranked(by_keyword[k], share[k], top_keyword[k])
+            }
+            for k, kw in enumerate(results.keywords)
+        }
+    }
@@ -1,12 +1,39 @@
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL = "gpt-4.1-mini"
+OPENAI_MAX_CONCURRENT = int(os.getenv("OPENAI_MAX_CONCURRENT", "10"))
+OPENAI_WEIGHT = float(os.getenv("OPENAI_WEIGHT", "1.0"))
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = "gemini-2.5-flash-lite"
+GEMINI_MAX_CONCURRENT = int(os.getenv("GEMINI_MAX_CONCURRENT", "3"))
+GEMINI_MIN_INTERVAL = float(os.getenv("GEMINI_MIN_INTERVAL", "1.5"))
+GEMINI_WEIGHT = float(os.getenv("GEMINI_WEIGHT", "1.0"))
+
+# extra OpenAI-compatible models, e.g.
+# [{"name": "mistral", "model": "mistral-small-latest",
+#   "base_url": "https://api.mistral.ai/v1", "api_key_env": "MISTRAL_API_KEY",
+#   "max_concurrent": 5, "min_interval": 0, "weight": 1.0}]
+EXTRA_PROVIDERS = json.loads(os.getenv("EXTRA_PROVIDERS", "[]"))
+
+# providers queried for visibility, and how to fan out across them
+LLM_PROVIDERS = [
+    p.strip()
+    for p in os.getenv("LLM_PROVIDERS", "openai,gemini").split(",")
+    if p.strip()
+]
+FANOUT_STRATEGY = os.getenv("FANOUT_STRATEGY", "all")   # all | first-k | early-exit-on-found
+FANOUT_K = int(os.getenv("FANOUT_K", "1"))
+FANOUT_QUORUM = float(os.getenv("FANOUT_QUORUM", "1.0"))
+
+# identical (seed_keyword, brand, market) submissions attach to a running
+# job, or to one that finished less than this many seconds ago
+COALESCE_WINDOW = float(os.getenv("COALESCE_WINDOW", "600"))
+
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = os.getenv("MONGO_DB","brand_visibility")
 MONGO_COLLECTION = os.getenv("MONGO_COLLECTION","visibility_runs")
@@ -1,6 +1,7 @@
 from pymongo import MongoClient
 from datetime import datetime
 from backend.config import MONGO_URI, MONGO_DB, MONGO_COLLECTION
+from backend.matching import MATCHER_VERSION
 
 client = MongoClient(MONGO_URI)
 
@@ -14,7 +15,8 @@ def save_run(
     brand: str,
     market: str,
     visibility: float,
-    top_3_brands: list[str]
+    top_3_brands: list[str],
+    answers: list[dict] | None = None
 ):
     doc = {
         "email": email,
@@ -23,6 +25,8 @@ def save_run(
         "market": market,
         "visibility": visibility,
         "top_3_brands": top_3_brands,
+        "answers": answers or [],
+        "matcher_version": MATCHER_VERSION,
         "created_at": datetime.utcnow()
     }
 
@@ -1,39 +1,114 @@
 import uuid
 import time
+import hashlib
 from threading import Lock
 
 JOBS = {}
+FINGERPRINTS = {}   # fingerprint -> latest job_id
 LOCK = Lock()
 
+# job fields that stay server-side
+PRIVATE_FIELDS = ("fingerprint", "requesters", "profile")
 
-def create_job(total_steps: int) -> str:
+
+def job_fingerprint(*parts) -> str:
+    normalized = "\x1f".join(" ".join(str(p).split()).casefold() for p in parts)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _new_job(total_steps: int, fingerprint: str | None, email: str | None) -> str:
     job_id = str(uuid.uuid4())
 
-    with LOCK:
-        JOBS[job_id] = {
-            "status": "running",
-            "progress": 0,
-            "total": total_steps,
-            "result": None,
-            "error": None,
-            "created_at": time.time()
-        }
+    JOBS[job_id] = {
+        "status": "running",
+        "progress": 0,
+        "total": total_steps,
+        "result": None,
+        "error": None,
+        "created_at": time.time(),
+        "finished_at": None,
+        "fingerprint": fingerprint,
+        "requesters": [email] if email else [],
+        "profile": None
+    }
+
+    if fingerprint:
+        FINGERPRINTS[fingerprint] = job_id
 
     return job_id
 
 
+def create_job(
+    total_steps: int,
+    fingerprint: str | None = None,
+    email: str | None = None
+) -> str:
+    with LOCK:
+        return _new_job(total_steps, fingerprint, email)
+
+
+def claim_job(fingerprint: str, email: str, window: float):
+    # attach to a running job, or one that finished within `window`
+    # seconds, with the same fingerprint; otherwise start a new one.
+    # returns (job_id, created, needs_save) where needs_save means the
+    # job already finished and this requester's run is not stored yet
+    with LOCK:
+        job_id = FINGERPRINTS.get(fingerprint)
+        job = JOBS.get(job_id)
+
+        reusable = job is not None and (
+            job["status"] == "running"
+            or (
+                job["status"] == "completed"
+                and time.time() - job["finished_at"] <= window
+            )
+        )
+
+        if not reusable:
+            return _new_job(0, fingerprint, email), True, False
+
+        if email in job["requesters"]:
+            return job_id, False, False
+
+        job["requesters"].append(email)
+        return job_id, False, job["status"] == "completed"
+
+
+def set_job_total(job_id: str, total_steps: int):
+    with LOCK:
+        if job_id in JOBS:
+            JOBS[job_id]["total"] = total_steps
+
+
+def job_requesters(job_id: str) -> list[str]:
+    with LOCK:
+        return list(JOBS[job_id]["requesters"]) if job_id in JOBS else []
+
+
 def update_job(job_id: str, step_inc: int = 1):
     with LOCK:
         if job_id in JOBS and JOBS[job_id]["status"] == "running":
             JOBS[job_id]["progress"] += step_inc
 
 
-def finish_job(job_id: str, result: dict):
+def finish_job(job_id: str, result: dict, saved: list[str] = ()) -> list[str]:
+    # returns requesters that attached after `saved` was taken
+    with LOCK:
+        if job_id not in JOBS:
+            return []
+
+        JOBS[job_id]["status"] = "completed"
+        JOBS[job_id]["result"] = result
+        JOBS[job_id]["progress"] = JOBS[job_id]["total"]
+        JOBS[job_id]["finished_at"] = time.time()
+
+        return [e for e in JOBS[job_id]["requesters"] if e not in saved]
+
+
+def set_job_profile(job_id: str, profile):
     with LOCK:
         if job_id in JOBS:
-            JOBS[job_id]["status"] = "completed"
-            JOBS[job_id]["result"] = result
-            JOBS[job_id]["progress"] = JOBS[job_id]["total"]
+            JOBS[job_id]["profile"] = profile
 
 
 def fail_job(job_id: str, error: str):
@@ -46,3 +121,14 @@ def fail_job(job_id: str, error: str):
 def get_job(job_id: str):
     with LOCK:
         return JOBS.get(job_id)
+
+
+def serialize_job(job: dict) -> dict:
+    # compact results are expanded to plain JSON only on the way out
+    job = {k: v for k, v in job.items() if k not in PRIVATE_FIELDS}
+    result = job.get("result")
+
+    if result is not None and hasattr(result.get("details"), "to_json"):
+        job["result"] = {**result, "details": result["details"].to_json()}
+
+    return job
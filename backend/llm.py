@@ -1,20 +1,89 @@
 from openai import OpenAI
 from google import genai
-from backend.config import OPENAI_API_KEY, MODEL, GEMINI_API_KEY, GEMINI_MODEL
+from backend.config import (
+    OPENAI_API_KEY,
+    MODEL,
+    OPENAI_MAX_CONCURRENT,
+    OPENAI_WEIGHT,
+    GEMINI_API_KEY,
+    GEMINI_MODEL,
+    GEMINI_MAX_CONCURRENT,
+    GEMINI_MIN_INTERVAL,
+    GEMINI_WEIGHT,
+    EXTRA_PROVIDERS,
+    LLM_PROVIDERS
+)
 from google.genai.errors import ClientError, ServerError
+import os
 import time
 import threading
 
 # -----------------------------
-# GLOBAL SAFETY CONTROLS
+# PROVIDER (model + limiter + weight)
 # -----------------------------
 
-OPENAI_SEMAPHORE = threading.Semaphore(10)   # max 10 concurrent OpenAI calls
-GEMINI_SEMAPHORE = threading.Semaphore(3)    # max 3 concurrent Gemini calls
+class Provider:
+    def __init__(
+        self,
+        name: str,
+        call,
+        model: str,
+        max_concurrent: int,
+        min_interval: float = 0.0,
+        weight: float = 1.0
+    ):
+        self.name = name
+        self.call = call              # (prompt, system, model) -> str
+        self.model = model
+        self.weight = weight
+        self.min_interval = min_interval
+
+        self.semaphore = threading.Semaphore(max_concurrent)
+        self.lock = threading.Lock()
+        self.last_call = 0.0
+
+    def _throttle(self):
+        if not self.min_interval:
+            return
+
+        with self.lock:
+            now = time.time()
+            if now - self.last_call < self.min_interval:
+                time.sleep(self.min_interval - (now - self.last_call))
+            self.last_call = time.time()
+
+    def ask(self, prompt: str, system: str) -> list[str]:
+        # a failed call raises, so it is never mistaken for an empty answer
+        with self.semaphore:
+            self._throttle()
+            text = self.call(prompt, system, self.model)
+
+        return [
+            line.strip().lower()
+            for line in (text or "").split("\n")
+            if line.strip()
+        ]
+
+# -----------------------------
+# REGISTRY
+# -----------------------------
+
+REGISTRY: dict[str, Provider] = {}
 
-GEMINI_LOCK = threading.Lock()
-LAST_CALL = 0
-MIN_INTERVAL = 1.5  # seconds (free tier safety)
+
+def register_provider(provider: Provider) -> Provider:
+    REGISTRY[provider.name] = provider
+    return provider
+
+
+def get_providers(names: list[str] | None = None) -> list[Provider]:
+    names = names or LLM_PROVIDERS
+
+    unknown = [n for n in names if n not in REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown LLM provider(s): {', '.join(unknown)}")
+
+    return [REGISTRY[n] for n in names]
 
 # -----------------------------
 # CLIENTS
@@ -27,23 +96,29 @@ client = genai.Client(api_key=GEMINI_API_KEY)
 # OPENAI
 # -----------------------------
 
+def _openai_call(prompt: str, system: str, model: str) -> str:
+    response = openai_client.responses.create(
+        model=model,
+        input=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+    )
+    return response.output_text
+
+
+register_provider(Provider(
+    name="openai",
+    call=_openai_call,
+    model=MODEL,
+    max_concurrent=OPENAI_MAX_CONCURRENT,
+    weight=OPENAI_WEIGHT
+))
+
+
 def ask_openai(prompt: str, system: str) -> list[str]:
     try:
-        with OPENAI_SEMAPHORE:
-            response = openai_client.responses.create(
-                model=MODEL,
-                input=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-
-        text = response.output_text or ""
-        return [
-            line.strip().lower()
-            for line in text.split("\n")
-            if line.strip()
-        ]
+        return REGISTRY["openai"].ask(prompt, system)
 
     except Exception as e:
         print("⚠️ OpenAI failure:", e)
@@ -53,29 +128,27 @@ def ask_openai(prompt: str, system: str) -> list[str]:
 # GEMINI
 # -----------------------------
 
-def ask_gemini(prompt: str, system: str) -> list[str]:
-    global LAST_CALL
+def _gemini_call(prompt: str, system: str, model: str) -> str:
+    response = client.models.generate_content(
+        model=model,
+        contents=f"{system}\n\n{prompt}"
+    )
+    return response.text
+
+
+register_provider(Provider(
+    name="gemini",
+    call=_gemini_call,
+    model=GEMINI_MODEL,
+    max_concurrent=GEMINI_MAX_CONCURRENT,
+    min_interval=GEMINI_MIN_INTERVAL,   # free tier safety
+    weight=GEMINI_WEIGHT
+))
+
 
+def ask_gemini(prompt: str, system: str) -> list[str]:
     try:
-        with GEMINI_SEMAPHORE:
-            # ---- soft rate limiting ----
-            with GEMINI_LOCK:
-                now = time.time()
-                if now - LAST_CALL < MIN_INTERVAL:
-                    time.sleep(MIN_INTERVAL - (now - LAST_CALL))
-                LAST_CALL = time.time()
-
-            response = client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=f"{system}\n\n{prompt}"
-            )
-
-        text = response.text or ""
-        return [
-            line.strip().lower()
-            for line in text.split("\n")
-            if line.strip()
-        ]
+        return REGISTRY["gemini"].ask(prompt, system)
 
     except (ClientError, ServerError) as e:
         print(f"⚠️ Gemini handled error ({type(e).__name__}): {e}")
@@ -84,3 +157,34 @@ def ask_gemini(prompt: str, system: str) -> list[str]:
     except Exception as e:
         print("⚠️ Unexpected Gemini failure:", e)
         return []
+
+# -----------------------------
+# EXTRA OPENAI-COMPATIBLE PROVIDERS
+# -----------------------------
+
+def _compatible_call(extra_client: OpenAI):
+    def call(prompt: str, system: str, model: str) -> str:
+        response = extra_client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ]
+        )
+        return response.choices[0].message.content
+
+    return call
+
+
+for spec in EXTRA_PROVIDERS:
+    register_provider(Provider(
+        name=spec["name"],
+        call=_compatible_call(OpenAI(
+            api_key=os.getenv(spec.get("api_key_env", "OPENAI_API_KEY")),
+            base_url=spec.get("base_url")
+        )),
+        model=spec["model"],
+        max_concurrent=int(spec.get("max_concurrent", 5)),
+        min_interval=float(spec.get("min_interval", 0.0)),
+        weight=float(spec.get("weight", 1.0))
+    ))
@@ -1,21 +1,39 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from threading import Thread
-from collections import Counter
 import random
 
-from backend.schemas import AnalysisInput
+from backend.schemas import AnalysisInput, RescoreInput
 from backend.semantic import expand_semantic_keywords
 from backend.prompts import generate_visibility_prompts
 from backend.visibility import check_visibility
+from backend.llm import get_providers
+from backend.config import (
+    FANOUT_STRATEGY,
+    FANOUT_K,
+    FANOUT_QUORUM,
+    LLM_PROVIDERS,
+    COALESCE_WINDOW
+)
 from backend.final_prompt import expand_existing_prompt
-from backend.db import save_run
+from backend.db import save_run, collection
+from backend.rescore import rescore_runs, build_query
+from backend.results import JobResults
+from backend.aggregate import aggregate_competitors
+from backend.profiling import SamplingProfiler
 
 from backend.jobs import (
+    job_fingerprint,
+    claim_job,
+    set_job_total,
+    job_requesters,
     create_job,
     update_job,
     finish_job,
     fail_job,
-    get_job
+    set_job_profile,
+    get_job,
+    serialize_job
 )
 
 app = FastAPI()
@@ -26,81 +44,142 @@ def health():
     return {"status": "ok"}
 
 
-def run_analysis(job_id: str, data: AnalysisInput):
-    try:
-        semantic_keywords = expand_semantic_keywords(data.seed_keyword)
+def store_run(email: str, data: AnalysisInput, result: dict):
+    save_run(
+        email=email,
+        seed_keyword=data.seed_keyword,
+        brand=data.brand,
+        market=data.market,
+        visibility=result["visibility_percentage"],
+        top_3_brands=result["top_3_brands"],
+        answers=result["details"].raw_answers()
+    )
 
-        PROMPTS_PER_SEM = 5
 
-        all_results = []
-        all_top_brands = []
-        total_appeared = 0
-        total_prompts = 0
+def store_runs(emails: list[str], data: AnalysisInput, result: dict):
+    # one requester's failed save must not fail the job for everyone else
+    for email in emails:
+        try:
+            store_run(email, data, result)
+        except Exception as e:
+            print(f"⚠️ Could not save run for {email}:", e)
 
-        for sk in semantic_keywords:
-            prompts = generate_visibility_prompts(sk, data.market)
-            visibility = check_visibility(prompts, data.brand)
 
-            total_appeared += visibility["appeared"]
-            total_prompts += visibility["total_prompts"]
+def run_analysis(job_id: str, data: AnalysisInput) -> dict:
+    semantic_keywords = expand_semantic_keywords(data.seed_keyword)
 
-            for item in visibility["details"]:
-                item["semantic_keyword"] = sk
-                all_results.append(item)
-                all_top_brands.extend(item["top_3_brands"])
+    PROMPTS_PER_SEM = 5
 
-                # ✅ PROMPT-LEVEL PROGRESS
-                update_job(job_id, 1)
+    providers = get_providers(data.providers)
+    fanout = data.fanout or FANOUT_STRATEGY
+    fanout_k = data.fanout_k or FANOUT_K
+    quorum = data.quorum or FANOUT_QUORUM
 
-        final_visibility = round(
-            (total_appeared / total_prompts) * 100, 2
-        ) if total_prompts else 0
+    all_results = JobResults([p.name for p in providers])
+    total_appeared = 0
+    total_prompts = 0
 
-        top_3 = [
-            b for b, _ in Counter(all_top_brands).most_common(3)
-        ]
+    for sk in semantic_keywords:
+        prompts = generate_visibility_prompts(sk, data.market)
+        visibility = check_visibility(
+            prompts,
+            data.brand,
+            providers,
+            fanout=fanout,
+            k=fanout_k,
+            quorum=quorum
+        )
 
-        # ---------------------------------
-        # PICK REAL PROMPT + EXPAND IT
-        # ---------------------------------
-        if all_results:
-            visible = [r for r in all_results if r["brand_found"]]
-            source = random.choice(visible if visible else all_results)
+        total_appeared += visibility["appeared"]
+        total_prompts += visibility["total_prompts"]
 
-            original_prompt = source["prompt"]
-            expanded_prompt = expand_existing_prompt(
-                short_prompt=original_prompt,
-                market=data.market
-            )
-        else:
-            original_prompt = ""
-            expanded_prompt = ""
+        sk_idx = all_results.add_keyword(sk)
 
-        save_run(
-            email=data.email,
-            seed_keyword=data.seed_keyword,
-            brand=data.brand,
-            market=data.market,
-            visibility=final_visibility,
-            top_3_brands=top_3
+        for record in visibility["details"]:
+            all_results.append(sk_idx, record)
+
+            # ✅ PROMPT-LEVEL PROGRESS
+            update_job(job_id, 1)
+
+    final_visibility = round(
+        (total_appeared / total_prompts) * 100, 2
+    ) if total_prompts else 0
+
+    competitors = aggregate_competitors(
+        all_results,
+        data.brand,
+        top_n=3,
+        provider_weights={p.name: p.weight for p in providers}
+    )
+    top_3 = [c["brand"] for c in competitors["top_brands"]]
+
+    # ---------------------------------
+    # PICK REAL PROMPT + EXPAND IT
+    # ---------------------------------
+    if all_results:
+        visible = all_results.visible_indices()
+        source = random.choice(visible if visible else range(len(all_results)))
+
+        original_prompt = all_results.prompts[source]
+        expanded_prompt = expand_existing_prompt(
+            short_prompt=original_prompt,
+            market=data.market
         )
+    else:
+        original_prompt = ""
+        expanded_prompt = ""
+
+    result = {
+        "seed_keyword": data.seed_keyword,
+        "semantic_keywords": semantic_keywords,
+        "brand": data.brand,
+        "market": data.market,
+        "total_prompts": total_prompts,
+        "appeared": total_appeared,
+        "visibility_percentage": final_visibility,
+        "fanout": fanout,
+        "providers": all_results.provider_summary(),
+        "top_3_brands": top_3,
+        "competitors": competitors,
+        "best_discovery_prompt": {
+            "original": original_prompt,
+            "expanded": expanded_prompt
+        },
+        "details": all_results
+    }
+
+    return result
+
+
+def complete_analysis(job_id: str, data: AnalysisInput, result: dict):
+    # every requester coalesced onto this job gets their own stored run
+    requesters = job_requesters(job_id)
+    store_runs(requesters, data, result)
 
-        finish_job(job_id, {
-            "email": data.email,
-            "seed_keyword": data.seed_keyword,
-            "semantic_keywords": semantic_keywords,
-            "brand": data.brand,
-            "market": data.market,
-            "total_prompts": total_prompts,
-            "appeared": total_appeared,
-            "visibility_percentage": final_visibility,
-            "top_3_brands": top_3,
-            "best_discovery_prompt": {
-                "original": original_prompt,
-                "expanded": expanded_prompt
-            },
-            "details": all_results
-        })
+    store_runs(finish_job(job_id, result, saved=requesters), data, result)
+
+
+def profile_analysis(job_id: str, data: AnalysisInput) -> dict:
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        with profiler.attach():
+            return run_analysis(job_id, data)
+    finally:
+        # stored before the job is marked completed, so a finished job
+        # always has its profile
+        profiler.stop()
+        set_job_profile(job_id, profiler)
+
+
+def run_job(job_id: str, data: AnalysisInput):
+    try:
+        if data.profile:
+            result = profile_analysis(job_id, data)
+        else:
+            result = run_analysis(job_id, data)
+
+        complete_analysis(job_id, data, result)
 
     except Exception as e:
         fail_job(job_id, str(e))
@@ -108,20 +187,60 @@ def run_analysis(job_id: str, data: AnalysisInput):
 
 @app.post("/analyze/start")
 def start_analysis(data: AnalysisInput):
-    semantic_keywords = expand_semantic_keywords(data.seed_keyword)
-    total_steps = len(semantic_keywords) * 5
+    # unknown providers are rejected here, before any LLM call is made
+    try:
+        get_providers(data.providers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    fingerprint = job_fingerprint(
+        data.seed_keyword,
+        data.brand,
+        data.market,
+        ",".join(data.providers or LLM_PROVIDERS),
+        data.fanout or FANOUT_STRATEGY,
+        data.fanout_k or FANOUT_K,
+        data.quorum or FANOUT_QUORUM,
+        data.profile
+    )
+
+    job_id, created, needs_save = claim_job(
+        fingerprint, data.email, COALESCE_WINDOW
+    )
+
+    if not created:
+        job = get_job(job_id)
+
+        if needs_save:
+            store_run(data.email, data, job["result"])
+
+        return {
+            "job_id": job_id,
+            # None while the job is still expanding its keywords;
+            # /analyze/status reports the total once it is known
+            "total_steps": job["total"] or None,
+            "coalesced": True
+        }
 
-    job_id = create_job(total_steps)
+    try:
+        semantic_keywords = expand_semantic_keywords(data.seed_keyword)
+    except Exception as e:
+        fail_job(job_id, str(e))
+        raise
+
+    total_steps = len(semantic_keywords) * 5
+    set_job_total(job_id, total_steps)
 
     Thread(
-        target=run_analysis,
+        target=run_job,
         args=(job_id, data),
         daemon=True
     ).start()
 
     return {
         "job_id": job_id,
-        "total_steps": total_steps
+        "total_steps": total_steps,
+        "coalesced": False
     }
 
 
@@ -130,4 +249,51 @@ def analyze_status(job_id: str):
     job = get_job(job_id)
     if not job:
         return {"error": "Job not found"}
-    return job
+    return serialize_job(job)
+
+
+@app.get("/analyze/profile/{job_id}")
+def analyze_profile(job_id: str, format: str = "speedscope"):
+    job = get_job(job_id)
+    if not job:
+        return {"error": "Job not found"}
+
+    profile = job.get("profile")
+    if profile is None:
+        return {"error": "No profile for this job"}
+
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    return profile.speedscope(name=f"analysis {job_id}")
+
+
+def run_rescore(job_id: str, data: RescoreInput):
+    try:
+        summary = rescore_runs(
+            brand=data.brand,
+            since=data.since,
+            dry_run=data.dry_run,
+            progress=lambda n: update_job(job_id, n)
+        )
+        finish_job(job_id, summary)
+
+    except Exception as e:
+        fail_job(job_id, str(e))
+
+
+@app.post("/rescore/start")
+def start_rescore(data: RescoreInput):
+    total_runs = collection.count_documents(build_query(data.since))
+
+    job_id = create_job(total_runs)
+
+    Thread(
+        target=run_rescore,
+        args=(job_id, data),
+        daemon=True
+    ).start()
+
+    return {
+        "job_id": job_id,
+        "total_steps": total_runs
+    }
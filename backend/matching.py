@@ -0,0 +1,50 @@
+import re
+from difflib import SequenceMatcher
+
+# bump MATCHER_VERSION whenever the threshold or matching logic changes,
+# so re-scored runs record which matcher produced their numbers
+SIMILARITY_THRESHOLD = 0.85
+MATCHER_VERSION = 2
+
+# -----------------------------
+# NAME NORMALIZATION
+# -----------------------------
+
+LIST_MARKER = re.compile(r"^\s*(?:[-*•·>]+|\(?\d+[.)]|#+)\s*")
+DESCRIPTION = re.compile(r"\s+[-–—]\s+.*$|\s*[:(].*$")
+MARKUP = re.compile(r"[*_`\"']+")
+COMPANY_SUFFIX = re.compile(
+    r"[\s,]+(?:inc|llc|ltd|limited|corp|corporation|co|gmbh|plc|pvt|private)\.?$"
+)
+SPACES = re.compile(r"\s+")
+
+
+def normalize_name(name: str) -> str:
+    name = MARKUP.sub("", name.lower())
+    name = LIST_MARKER.sub("", name)
+    name = DESCRIPTION.sub("", name)
+
+    previous = None
+    while previous != name:
+        previous = name
+        name = COMPANY_SUFFIX.sub("", name.strip())
+
+    return SPACES.sub(" ", name).strip(" .,;")
+
+# -----------------------------
+# BRAND MATCHING
+# -----------------------------
+
+def similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+def brand_matches(brand: str, line: str) -> bool:
+    # answers come back as "1. **Acme Inc** - CRM suite"; compare the bare
+    # names so visibility and share of voice agree on what counts as the brand
+    brand, line = normalize_name(brand), normalize_name(line)
+    return bool(brand and line) and similarity(brand, line) >= SIMILARITY_THRESHOLD
+
+
+def is_brand_visible(brand: str, brands: list[str]) -> bool:
+    return any(brand_matches(brand, b) for b in brands)
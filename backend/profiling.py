@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+SAMPLE_INTERVAL = 0.005   # seconds between wall-clock samples
+
+# set only inside profiled jobs; everything else sees None
+CURRENT = ContextVar("profiler", default=None)
+
+# -----------------------------
+# SAMPLING PROFILER
+# -----------------------------
+
+class SamplingProfiler:
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.threads = set()
+        self.samples = Counter()     # stack (tuple of code objects) -> hits
+        self.started_at = None
+        self.duration = 0.0
+
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._sampler = threading.Thread(
+            target=self._run,
+            name="job-profiler",
+            daemon=True
+        )
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.duration = time.time() - self.started_at
+
+    @contextmanager
+    def attach(self):
+        ident = threading.get_ident()
+        self.threads.add(ident)
+        token = CURRENT.set(self)
+        try:
+            yield self
+        finally:
+            CURRENT.reset(token)
+            self.threads.discard(ident)
+
+    def _run(self):
+        # sys._current_frames also sees threads blocked on I/O or locks,
+        # so the samples are wall-clock, not CPU time
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+
+                if stack:
+                    self.samples[tuple(reversed(stack))] += 1
+
+    # -----------------------------
+    # EXPORT
+    # -----------------------------
+
+    def collapsed(self) -> str:
+        return "\n".join(
+            f"{';'.join(_label(code) for code in stack)} {count}"
+            for stack, count in self.samples.most_common()
+        )
+
+    def speedscope(self, name: str) -> dict:
+        frame_index = {}
+        frames = []
+        samples = []
+        weights = []
+
+        for stack, count in self.samples.items():
+            indices = []
+            for code in stack:
+                if code not in frame_index:
+                    frame_index[code] = len(frames)
+                    frames.append({
+                        "name": code.co_name,
+                        "file": code.co_filename,
+                        "line": code.co_firstlineno
+                    })
+                indices.append(frame_index[code])
+
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "prompt-expander",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+# -----------------------------
+# THREAD PROPAGATION
+# -----------------------------
+
+def profiled(fn):
+    # wrap work handed to a pool so the worker thread is sampled too;
+    # returns fn untouched when no profiler is active
+    profiler = CURRENT.get()
+    if profiler is None:
+        return fn
+
+    def run(*args, **kwargs):
+        with profiler.attach():
+            return fn(*args, **kwargs)
+
+    return run
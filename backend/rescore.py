@@ -0,0 +1,228 @@
+import argparse
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+from pymongo import UpdateOne
+
+from backend.db import collection
+from backend.matching import brand_matches, MATCHER_VERSION
+
+BATCH_SIZE = 500
+MATCH_CACHE_SIZE = 1 << 20
+
+PROJECTION = {"brand": 1, "answers": 1}
+
+# -----------------------------
+# SCORING (one vectorized pass per batch)
+# -----------------------------
+
+def score_batch(docs: list[dict], brand: str | None = None, match=brand_matches) -> list[dict]:
+    providers = {}
+    pairs = {}
+
+    prompt_run = []
+    called_prompt, called_provider = [], []
+    mention_prompt, mention_provider, mention_pair = [], [], []
+
+    for run, doc in enumerate(docs):
+        target = brand or doc["brand"]
+
+        for answer in doc.get("answers", []):
+            prompt = len(prompt_run)
+            prompt_run.append(run)
+
+            for name, lines in answer["providers"].items():
+                p = providers.setdefault(name, len(providers))
+                called_prompt.append(prompt)
+                called_provider.append(p)
+
+                for line in lines:
+                    mention_prompt.append(prompt)
+                    mention_provider.append(p)
+                    mention_pair.append(pairs.setdefault((target, line), len(pairs)))
+
+    n_runs = len(docs)
+    n_prompts = len(prompt_run)
+    n_providers = max(len(providers), 1)
+
+    matched = np.fromiter(
+        (match(b, line) for b, line in pairs),
+        dtype=bool,
+        count=len(pairs)
+    )
+
+    mention_slot = (
+        np.array(mention_prompt, dtype=np.intp) * n_providers
+        + np.array(mention_provider, dtype=np.intp)
+    )
+    called_slot = (
+        np.array(called_prompt, dtype=np.intp) * n_providers
+        + np.array(called_provider, dtype=np.intp)
+    )
+
+    found = np.zeros(n_prompts * n_providers, dtype=bool)
+    found[mention_slot[matched[np.array(mention_pair, dtype=np.intp)]]] = True
+    found = found.reshape(n_prompts, n_providers)
+
+    called = np.zeros(n_prompts * n_providers, dtype=bool)
+    called[called_slot] = True
+    called = called.reshape(n_prompts, n_providers)
+
+    # ---- per run totals ----
+    prompt_run = np.array(prompt_run, dtype=np.intp)
+
+    run_prompts = np.bincount(prompt_run, minlength=n_runs)
+    run_appeared = np.bincount(
+        prompt_run, weights=found.any(axis=1), minlength=n_runs
+    )
+
+    run_provider = (prompt_run[:, None] * n_providers + np.arange(n_providers)).ravel()
+    provider_found = np.bincount(
+        run_provider, weights=found.ravel(), minlength=n_runs * n_providers
+    ).reshape(n_runs, n_providers)
+    provider_called = np.bincount(
+        run_provider, weights=called.ravel(), minlength=n_runs * n_providers
+    ).reshape(n_runs, n_providers)
+
+    visibility = np.divide(
+        run_appeared * 100.0, run_prompts,
+        out=np.zeros(n_runs), where=run_prompts > 0
+    )
+    provider_visibility = np.divide(
+        provider_found * 100.0, provider_called,
+        out=np.zeros((n_runs, n_providers)), where=provider_called > 0
+    )
+
+    names = list(providers)
+    return [
+        {
+            "visibility": round(float(visibility[r]), 2),
+            "provider_visibility": {
+                name: round(float(provider_visibility[r, p]), 2)
+                for p, name in enumerate(names)
+                if provider_called[r, p]
+            }
+        }
+        for r in range(n_runs)
+    ]
+
+# -----------------------------
+# MONGO STREAMING
+# -----------------------------
+
+def build_query(since: datetime | None = None) -> dict:
+    # runs stored before raw answers were kept cannot be re-scored
+    query = {"answers.0": {"$exists": True}}
+    if since is not None:
+        query["created_at"] = {"$gte": since}
+    return query
+
+
+def _updates(docs: list[dict], scores: list[dict], brand: str | None) -> list:
+    now = datetime.utcnow()
+    ops = []
+
+    for doc, score in zip(docs, scores):
+        if brand is None:
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+                **score,
+                "matcher_version": MATCHER_VERSION,
+                "rescored_at": now
+            }}))
+            continue
+
+        # scores for other brands live next to the run's own score; one
+        # pipeline update swaps this brand's entry so it is never missing
+        entry = {
+            "brand": brand,
+            **score,
+            "matcher_version": MATCHER_VERSION,
+            "rescored_at": now
+        }
+        ops.append(UpdateOne({"_id": doc["_id"]}, [{"$set": {"brand_scores": {
+            "$concatArrays": [
+                {"$filter": {
+                    "input": {"$ifNull": ["$brand_scores", []]},
+                    "cond": {"$ne": ["$$this.brand", {"$literal": brand}]}
+                }},
+                {"$literal": [entry]}
+            ]
+        }}}]))
+
+    return ops
+
+
+def rescore_runs(
+    brand: str | None = None,
+    since: datetime | None = None,
+    batch_size: int = BATCH_SIZE,
+    dry_run: bool = False,
+    progress=None
+) -> dict:
+    cursor = collection.find(build_query(since), PROJECTION, batch_size=batch_size)
+
+    # history repeats the same answer lines constantly, so the matcher only
+    # runs once per distinct (brand, line) pair; the cache lives for this
+    # run only and is freed with it
+    match = lru_cache(maxsize=MATCH_CACHE_SIZE)(brand_matches)
+
+    runs = 0
+    changed = 0
+    batch = []
+
+    def flush():
+        nonlocal runs, changed
+
+        scores = score_batch(batch, brand, match)
+        if not dry_run:
+            result = collection.bulk_write(_updates(batch, scores, brand), ordered=True)
+            changed += result.modified_count
+
+        runs += len(batch)
+        if progress is not None:
+            progress(len(batch))
+        batch.clear()
+
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    return {
+        "brand": brand,
+        "runs": runs,
+        "modified": changed,
+        "matcher_version": MATCHER_VERSION,
+        "dry_run": dry_run
+    }
+
+# -----------------------------
+# CLI
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-score stored runs with the current brand matcher (no LLM calls)."
+    )
+    parser.add_argument("--brand", help="score this brand instead of each run's own brand")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only runs created on/after this date")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="score without writing")
+    args = parser.parse_args()
+
+    summary = rescore_runs(
+        brand=args.brand,
+        since=args.since,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        progress=lambda n: print(f"… {n} runs scored")
+    )
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+from array import array
+
+# -----------------------------
+# BRAND INTERNING
+# -----------------------------
+
+class BrandTable:
+    # one per job, written only by that job's thread, so no locking
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def intern(self, name: str) -> int:
+        brand_id = self._ids.get(name)
+        if brand_id is None:
+            brand_id = len(self._names)
+            self._names.append(name)
+            self._ids[name] = brand_id
+        return brand_id
+
+    def intern_many(self, names: list[str]) -> array:
+        return array("I", [self.intern(n) for n in names])
+
+    def names(self, brand_ids) -> list[str]:
+        names = self._names
+        return [names[i] for i in brand_ids]
+
+# -----------------------------
+# PROMPT RECORD (one row)
+# -----------------------------
+
+class PromptRecord:
+    __slots__ = ("prompt", "found", "called", "failed", "answers")
+
+    def __init__(self, prompt: str, found: int, called: int, failed: int, answers: tuple):
+        self.prompt = prompt
+        self.found = found            # bitmask, bit i -> i-th provider of the job
+        self.called = called          # bitmask of providers that actually answered
+        self.failed = failed          # bitmask of providers whose call raised;
+                                      # neither called nor failed -> never started
+        self.answers = answers        # one list of lines per provider, in answer order
+
+    @property
+    def brand_found(self) -> bool:
+        return self.found != 0
+
+
+def found_mask(flags: list[bool]) -> int:
+    mask = 0
+    for i, flag in enumerate(flags):
+        if flag:
+            mask |= 1 << i
+    return mask
+
+
+def row_to_dict(
+    brands: BrandTable,
+    providers: tuple,
+    prompt: str,
+    found: int,
+    called: int,
+    failed: int,
+    brand_ids: list,
+    top_ids,
+    semantic_keyword: str | None = None
+) -> dict:
+    item = {
+        "prompt": prompt,
+        "brand_found": found != 0,
+        "providers": {
+            provider: {
+                "called": bool(called >> i & 1),
+                "failed": bool(failed >> i & 1),
+                "found": bool(found >> i & 1),
+                "brands": brands.names(ids)
+            }
+            for i, (provider, ids) in enumerate(zip(providers, brand_ids))
+        },
+        "top_3_brands": brands.names(top_ids)
+    }
+
+    if semantic_keyword is not None:
+        item["semantic_keyword"] = semantic_keyword
+
+    return item
+
+# -----------------------------
+# JOB RESULTS (columnar)
+# -----------------------------
+
+class JobResults:
+    __slots__ = (
+        "providers",
+        "brands",
+        "keywords",
+        "prompts",
+        "keyword_idx",
+        "found",
+        "called",
+        "failed",
+        "brand_ids",
+        "brand_offsets",
+        "top_ids",
+        "top_offsets",
+    )
+
+    def __init__(self, providers: tuple):
+        if len(providers) > 16:
+            raise ValueError("At most 16 providers fit in the found/called flags")
+
+        self.providers = tuple(providers)
+        # per job, so brand strings are freed together with the job
+        self.brands = BrandTable()
+        self.keywords = []
+        self.prompts = []
+        self.keyword_idx = array("H")
+        self.found = array("H")
+        self.called = array("H")
+        self.failed = array("H")
+        # flat brand ids; prompt i / provider p lives at
+        # brand_offsets[i * len(providers) + p] : [... + 1]
+        self.brand_ids = array("I")
+        self.brand_offsets = array("I", [0])
+        # filled in by backend.aggregate once the whole job is known
+        self.top_ids = array("I")
+        self.top_offsets = array("I")
+
+    def __len__(self) -> int:
+        return len(self.prompts)
+
+    def add_keyword(self, keyword: str) -> int:
+        self.keywords.append(keyword)
+        return len(self.keywords) - 1
+
+    def append(self, keyword_idx: int, record: PromptRecord):
+        self.prompts.append(record.prompt)
+        self.keyword_idx.append(keyword_idx)
+        self.found.append(record.found)
+        self.called.append(record.called)
+        self.failed.append(record.failed)
+
+        for answer in record.answers:
+            self.brand_ids.extend(self.brands.intern_many(answer))
+            self.brand_offsets.append(len(self.brand_ids))
+
+    @property
+    def appeared(self) -> int:
+        return len(self.found) - self.found.count(0)
+
+    def visible_indices(self) -> list[int]:
+        return [i for i, mask in enumerate(self.found) if mask]
+
+    def provider_summary(self) -> dict:
+        return {
+            provider: {
+                "called": sum(1 for mask in self.called if mask >> p & 1),
+                "failed": sum(1 for mask in self.failed if mask >> p & 1),
+                "appeared": sum(1 for mask in self.found if mask >> p & 1)
+            }
+            for p, provider in enumerate(self.providers)
+        }
+
+    def brands_for(self, i: int) -> list[array]:
+        n = len(self.providers)
+        offsets = self.brand_offsets
+        return [
+            self.brand_ids[offsets[i * n + p]:offsets[i * n + p + 1]]
+            for p in range(n)
+        ]
+
+    def set_top_brands(self, top_ids: list[int], top_offsets: list[int]):
+        self.top_ids = array("I", top_ids)
+        self.top_offsets = array("I", top_offsets)
+
+    def top_for(self, i: int) -> array:
+        if i + 1 >= len(self.top_offsets):
+            return array("I")
+        return self.top_ids[self.top_offsets[i]:self.top_offsets[i + 1]]
+
+    def row(self, i: int) -> dict:
+        return row_to_dict(
+            brands=self.brands,
+            providers=self.providers,
+            prompt=self.prompts[i],
+            found=self.found[i],
+            called=self.called[i],
+            failed=self.failed[i],
+            brand_ids=self.brands_for(i),
+            top_ids=self.top_for(i),
+            semantic_keyword=self.keywords[self.keyword_idx[i]]
+        )
+
+    def raw_answers(self) -> list[dict]:
+        # what each provider actually said, kept on stored runs so they
+        # can be re-scored later without new LLM calls
+        return [
+            {
+                "prompt": self.prompts[i],
+                "semantic_keyword": self.keywords[self.keyword_idx[i]],
+                "providers": {
+                    provider: self.brands.names(ids)
+                    for p, (provider, ids) in enumerate(zip(self.providers, self.brands_for(i)))
+                    if self.called[i] >> p & 1
+                }
+            }
+            for i in range(len(self))
+        ]
+
+    def to_json(self) -> list[dict]:
+        return [self.row(i) for i in range(len(self))]
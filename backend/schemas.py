@@ -1,5 +1,6 @@
-from pydantic import BaseModel,EmailStr
-from typing import List
+from pydantic import BaseModel,EmailStr,Field
+from typing import List, Literal, Optional
+from datetime import datetime
 
 
 class AnalysisInput(BaseModel):
@@ -7,6 +8,16 @@ class AnalysisInput(BaseModel):
     seed_keyword: str
     brand: str
     market: str
+    providers: Optional[List[str]] = None
+    fanout: Optional[Literal["all", "first-k", "early-exit-on-found"]] = None
+    fanout_k: Optional[int] = Field(None, ge=1)
+    quorum: Optional[float] = Field(None, gt=0)
+    profile: bool = False
+
+class RescoreInput(BaseModel):
+    brand: Optional[str] = None
+    since: Optional[datetime] = None
+    dry_run: bool = False
 
 class PromptResult(BaseModel):
     prompt: str
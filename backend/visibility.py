@@ -1,10 +1,13 @@
-from difflib import SequenceMatcher
-from collections import Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
-from backend.llm import ask_openai, ask_gemini
+from backend.config import FANOUT_STRATEGY, FANOUT_K, FANOUT_QUORUM
+from backend.llm import Provider
+from backend.results import PromptRecord, found_mask
+from backend.profiling import profiled
+from backend.matching import SIMILARITY_THRESHOLD, similarity, is_brand_visible
 
-SIMILARITY_THRESHOLD = 0.85
+FANOUT_STRATEGIES = ("all", "first-k", "early-exit-on-found")
 
 VISIBILITY_SYSTEM_PROMPT = """
 You are a neutral market analyst.
@@ -19,66 +22,138 @@ Rules:
 """
 
 
-def similarity(a: str, b: str) -> float:
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+def _calls_wanted(
+    providers: list[Provider],
+    waiting: deque,
+    in_flight: int,
+    fanout: str,
+    k: int,
+    quorum: float,
+    answered: int,
+    seen_weight: float
+) -> int:
+    # how many of the waiting providers (best weight first) to start now
+    if fanout == "all":
+        return len(waiting)
+
+    if fanout == "first-k":
+        # a failed call frees its slot for the next provider
+        return max(k - answered - in_flight, 0)
+
+    # early-exit-on-found: start the smallest batch that could still reach
+    # the quorum, and only once the previous batch has fully answered
+    if in_flight or seen_weight >= quorum:
+        return 0
+
+    needed = quorum - seen_weight
+    batch = 0
+    for i in waiting:
+        batch += 1
+        needed -= providers[i].weight
+        if needed <= 0:
+            break
+    return batch
+
+
+def process_prompt(
+    prompt: str,
+    brand: str,
+    providers: list[Provider],
+    fanout: str = FANOUT_STRATEGY,
+    k: int = FANOUT_K,
+    quorum: float = FANOUT_QUORUM
+):
+    # all                 -> call every provider at once
+    # first-k             -> call the k heaviest providers, replacing
+    #                        any that fail with the next one
+    # early-exit-on-found -> call providers heaviest first, in batches,
+    #                        until those that saw the brand reach `quorum`
+    # providers that are never started are simply not called; a started
+    # call is always awaited and kept, since it is already paid for
+    answers = [[] for _ in providers]
+    called = [False] * len(providers)
+    failed = [False] * len(providers)
+    found = [False] * len(providers)
+
+    answered = 0
+    seen_weight = 0.0
+
+    waiting = deque(sorted(
+        range(len(providers)), key=lambda i: -providers[i].weight
+    ))
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max(len(providers), 1)) as executor:
+        while True:
+            wanted = _calls_wanted(
+                providers, waiting, len(in_flight),
+                fanout, k, quorum, answered, seen_weight
+            )
+            for _ in range(min(wanted, len(waiting))):
+                i = waiting.popleft()
+                future = executor.submit(
+                    profiled(providers[i].ask), prompt, VISIBILITY_SYSTEM_PROMPT
+                )
+                in_flight[future] = i
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                i = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"⚠️ {providers[i].name.upper()} failed:", e)
+                    failed[i] = True
+                    continue
+
+                answers[i] = result
+                called[i] = True
+                found[i] = is_brand_visible(brand, result)
+
+                answered += 1
+                if found[i]:
+                    seen_weight += providers[i].weight
+
+    # competitor ranking happens job-wide in backend.aggregate
+    return PromptRecord(
+        prompt=prompt,
+        found=found_mask(found),
+        called=found_mask(called),
+        failed=found_mask(failed),
+        answers=tuple(answers)
+    )
+
+
+def check_visibility(
+    prompts: list[str],
+    brand: str,
+    providers: list[Provider],
+    fanout: str = FANOUT_STRATEGY,
+    k: int = FANOUT_K,
+    quorum: float = FANOUT_QUORUM
+):
+    if fanout not in FANOUT_STRATEGIES:
+        raise ValueError(f"Unknown fan-out strategy: {fanout}")
 
-
-def is_brand_visible(brand: str, brands: list[str]) -> bool:
-    return any(similarity(brand, b) >= SIMILARITY_THRESHOLD for b in brands)
-
-
-def process_prompt(prompt: str, brand: str):
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        futures = {
-            executor.submit(ask_openai, prompt, VISIBILITY_SYSTEM_PROMPT): "openai",
-            executor.submit(ask_gemini, prompt, VISIBILITY_SYSTEM_PROMPT): "gemini",
-        }
-
-        openai_brands = []
-        gemini_brands = []
-
-        for future in as_completed(futures):
-            source = futures[future]
-            try:
-                result = future.result()
-                if source == "openai":
-                    openai_brands = result
-                else:
-                    gemini_brands = result
-            except Exception as e:
-                print(f"⚠️ {source.upper()} failed:", e)
-
-    found_openai = is_brand_visible(brand, openai_brands)
-    found_gemini = is_brand_visible(brand, gemini_brands)
-
-    combined = list(set(openai_brands + gemini_brands))
-    top_3 = [b for b, _ in Counter(combined).most_common(3)]
-
-    return {
-        "prompt": prompt,
-        "brand_found": found_openai or found_gemini,
-        "found_in_openai": found_openai,
-        "found_in_gemini": found_gemini,
-        "top_3_brands": top_3,
-        "openai_brands": openai_brands,
-        "gemini_brands": gemini_brands
-    }
-
-
-def check_visibility(prompts: list[str], brand: str):
     results = []
     appeared = 0
 
     with ThreadPoolExecutor(max_workers=5) as executor:
         futures = [
-            executor.submit(process_prompt, p, brand)
+            executor.submit(
+                profiled(process_prompt), p, brand, providers, fanout, k, quorum
+            )
             for p in prompts
         ]
 
         for future in as_completed(futures):
             r = future.result()
             results.append(r)
-            if r["brand_found"]:
+            if r.brand_found:
                 appeared += 1
 
     total = len(results)
@@ -0,0 +1,88 @@
+# Bytes retained per prompt result: legacy dict rows vs. columnar JobResults.
+# The compact side includes its job's brand table (first-seen strings).
+#
+#   python -m benchmarks.result_memory
+
+import gc
+import random
+import tracemalloc
+from collections import Counter
+
+from backend.aggregate import aggregate_competitors
+from backend.results import JobResults, PromptRecord, found_mask
+
+VOCAB = [f"brand {i}" for i in range(300)]
+BRANDS_PER_ANSWER = 10
+KEYWORDS = ["ai chatbot", "conversational ai platform", "customer support bot"]
+
+
+def fake_answer(rng: random.Random) -> list[str]:
+    # LLM answers arrive as freshly allocated strings, never shared objects
+    return ["".join(b) for b in rng.sample(VOCAB, BRANDS_PER_ANSWER)]
+
+
+def build_legacy(n: int, rng: random.Random) -> list[dict]:
+    rows = []
+    for i in range(n):
+        openai_brands = fake_answer(rng)
+        gemini_brands = fake_answer(rng)
+        combined = list(set(openai_brands + gemini_brands))
+        rows.append({
+            "prompt": f"best ai chatbot tools for startups {i}",
+            "brand_found": i % 3 == 0,
+            "found_in_openai": i % 3 == 0,
+            "found_in_gemini": i % 6 == 0,
+            "top_3_brands": [b for b, _ in Counter(combined).most_common(3)],
+            "openai_brands": openai_brands,
+            "gemini_brands": gemini_brands,
+            "semantic_keyword": "".join(KEYWORDS[i % len(KEYWORDS)]),
+        })
+    return rows
+
+
+def build_compact(n: int, rng: random.Random) -> JobResults:
+    results = JobResults(("openai", "gemini"))
+    for kw in KEYWORDS:
+        results.add_keyword(kw)
+
+    for i in range(n):
+        record = PromptRecord(
+            prompt=f"best ai chatbot tools for startups {i}",
+            found=found_mask([i % 3 == 0, i % 6 == 0]),
+            called=found_mask([True, True]),
+            failed=0,
+            answers=(fake_answer(rng), fake_answer(rng))
+        )
+        results.append(i % len(KEYWORDS), record)
+
+    # per-prompt top brands are filled in by the job-wide aggregation
+    aggregate_competitors(results, "example.ai")
+    return results
+
+
+def retained_bytes(build, n: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(n, random.Random(42))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def main():
+    # one throwaway job so lazy numpy imports are not charged to a run;
+    # each job has its own brand table, so nothing is shared afterwards
+    build_compact(100, random.Random(0))
+
+    print(f"{'prompts':>8} {'legacy B/prompt':>16} {'compact B/prompt':>17} {'ratio':>6}")
+    for n in (1_000, 10_000):
+        legacy = retained_bytes(build_legacy, n) / n
+        compact = retained_bytes(build_compact, n) / n
+        print(f"{n:>8} {legacy:>16.0f} {compact:>17.0f} {legacy / compact:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,18 @@ st.caption(
     "Measures where and how often your brand appears in AI discovery answers"
 )
 
+# ---------------------------------
+# HELPERS
+# ---------------------------------
+def provider_status(p: dict, fanout: str | None):
+    # tooltip for a provider checkbox; only first-k / early exit skip calls
+    if p["called"]:
+        return None
+    if p.get("failed"):
+        return "Call failed"
+    return f"Skipped ({fanout})" if fanout else "Skipped"
+
+
 # ---------------------------------
 # SIDEBAR INPUTS
 # ---------------------------------
@@ -151,49 +163,61 @@ if run:
             st.markdown("**Prompt-level visibility:**")
 
             for i in items:
-                col1, col2, col3, col4 = st.columns([6, 1, 1, 2])
+                providers = i.get("providers", {})
+                cols = st.columns([6] + [1] * len(providers) + [2])
 
-                found_openai = i.get("found_in_openai", False)
-                found_gemini = i.get("found_in_gemini", False)
+                called = [p for p in providers.values() if p["called"]]
+                found = [p for p in called if p["found"]]
 
                 # ---- Visibility strength logic ----
-                if found_openai and found_gemini:
+                if found and len(found) == len(called):
                     strength = "Strong"
-                elif found_openai or found_gemini:
+                elif found:
                     strength = "Partial"
                 else:
                     strength = "Missing"
 
-                with col1:
+                with cols[0]:
                     icon = "✅" if i["brand_found"] else "❌"
                     st.markdown(f"{icon} **{i['prompt']}**")
 
-                with col2:
-                    st.checkbox(
-                        "OpenAI",
-                        value=found_openai,
-                        disabled=True,
-                        key=f"openai_{semantic}_{hash(i['prompt'])}"
-                    )
-
-                with col3:
-                    st.checkbox(
-                        "Gemini",
-                        value=found_gemini,
-                        disabled=True,
-                        key=f"gemini_{semantic}_{hash(i['prompt'])}"
-                    )
-
-                with col4:
+                for col, (name, p) in zip(cols[1:-1], providers.items()):
+                    with col:
+                        st.checkbox(
+                            name,
+                            value=p["found"],
+                            disabled=True,
+                            help=provider_status(p, data.get("fanout")),
+                            key=f"{name}_{semantic}_{hash(i['prompt'])}"
+                        )
+
+                with cols[-1]:
                     st.markdown(f"**{strength}**")
 
+            sov = data.get("competitors", {}).get("by_keyword", {}).get(semantic)
+
+            if sov and sov["competitors"]:
+                st.markdown(
+                    f"**Share of voice** — your brand: "
+                    f"{sov['brand_share_of_voice']}%"
+                )
+                for c in sov["competitors"]:
+                    st.markdown(f"- {c['brand']}: {c['share_of_voice']}%")
+
     # ---------------------------------
     # FINAL TOP 3 BRANDS
     # ---------------------------------
     st.divider()
     st.subheader("🏆 Top 3 Brands Seen Across All LLMs")
 
-    if data.get("top_3_brands"):
+    top_brands = data.get("competitors", {}).get("top_brands")
+
+    if top_brands:
+        with st.container(border=True):
+            for idx, c in enumerate(top_brands, start=1):
+                st.markdown(f"### {idx}. {c['brand']}")
+                st.caption(f"Share of voice: {c['share_of_voice']}%")
+    elif data.get("top_3_brands"):
         with st.container(border=True):
             for idx, b in enumerate(data["top_3_brands"], start=1):
                 st.markdown(f"### {idx}. {b}")